@@ -0,0 +1,262 @@
+import numpy as np
+
+
+# Group id -> colour used when drawing, index 0 is the first half of the agents.
+GROUP_COLORS = ('yellow', 'blue')
+
+
+def similar_counts(groups):
+    '''Counts similar and occupied neighbours for every cell.
+
+    Takes an integer array of group ids with shape (..., n, n), where
+    empty cells are -1. Any leading dimensions (e.g. replicas) are
+    processed in the same pass.
+
+    Returns two arrays (similar, occupied) with the same shape as groups.
+    The neighbourhood is the same 8 cells as in base.Neighbour, the world
+    does not wrap around its edges.'''
+    pad = [(0, 0)] * (groups.ndim - 2) + [(1, 1), (1, 1)]
+    return padded_counts(np.pad(groups, pad, constant_values = -1))
+
+
+def padded_counts(padded):
+    '''As similar_counts, but takes the group ids already padded with
+    one row/column of empty cells (-1) on each side of the last two
+    dimensions, so callers can keep a padded array between ticks.'''
+    groups = padded[..., 1:-1, 1:-1]
+    n_x, n_y = groups.shape[-2], groups.shape[-1]
+
+    similar = np.zeros(groups.shape, dtype = np.int8)
+    occupied = np.zeros(groups.shape, dtype = np.int8)
+    for dx in (-1, 0, 1):
+        for dy in (-1, 0, 1):
+            if dx == 0 and dy == 0:
+                continue
+            other = padded[..., 1+dx:1+dx+n_x, 1+dy:1+dy+n_y]
+            occupied += other >= 0
+            similar += other == groups
+    # Empty centre cells match empty neighbours, they are masked by the caller.
+    return similar, occupied
+
+
+def happy_mask(similar, occupied, threshold):
+    '''Returns a boolean array, True where the proportion of similar
+    neighbours is at least threshold. No neighbours means unhappy,
+    as in Schelling.is_happy.'''
+    prop_similar = similar.astype(np.float32) / np.maximum(occupied, 1).astype(np.float32)
+    return (occupied > 0) & (prop_similar >= threshold)
+
+
+def serial_targets(vacant, old_cells, slots):
+    '''Picks target cells for agents moving one at a time.
+
+    vacant is an array of empty cells, old_cells the cells of the moving
+    agents in the order they move and slots a random index into vacant
+    for each of them. Each agent takes the cell in its slot and leaves
+    its old cell there for the agents after it, as with Schelling.move.
+
+    The slot of vacant each agent picks does not depend on earlier moves,
+    so an agent's target is the old cell of the last agent before it that
+    picked the same slot, or the original content of the slot. This gives
+    the serial result without a loop over the agents.
+
+    Returns the array of target cells, vacant is updated in place.'''
+    old_cells = np.asarray(old_cells)
+    slots = np.asarray(slots)
+    order = np.argsort(slots, kind = 'stable')
+    sorted_slots = slots[order]
+    repeat = np.zeros(len(slots), dtype = bool)
+    repeat[1:] = sorted_slots[1:] == sorted_slots[:-1]
+
+    targets = vacant[slots]
+    targets[order[1:][repeat[1:]]] = old_cells[order[:-1][repeat[1:]]]
+
+    last = np.ones(len(slots), dtype = bool)
+    last[:-1] = ~repeat[1:]
+    vacant[sorted_slots[last]] = old_cells[order[last]]
+    return targets
+
+
+def synchronous_targets(vacant, slots):
+    '''Picks target cells for agents moving all at once.
+
+    vacant is an array of empty cells and slots a random index into
+    vacant for each agent, the agents being in random priority order.
+    A slot claimed by several agents goes to the first of them, the
+    others stay where they are. Cells vacated by the winners are not
+    available until the next tick.
+
+    Returns the indices of the agents that move and their target cells.'''
+    slots = np.asarray(slots)
+    slot, won = np.unique(slots, return_index = True)
+    return won, vacant[slot]
+
+
+def place_agents(rng, grid_size, N):
+    '''Picks random distinct cells for N agents on a grid_size x grid_size
+    grid. As in Visual.create_turtles the first half of the agents (and
+    one more) belong to group 0, the rest to group 1.
+
+    Returns the flat cell index and the group id (int8) of each agent.'''
+    if N > grid_size*grid_size:
+        raise ValueError("Number of turtles exceeds world!")
+    cells = rng.choice(grid_size*grid_size, N, replace = False)
+    group = np.where(np.arange(N) <= N//2, 0, 1).astype(np.int8)
+    return cells, group
+
+
+class AgentStore(object):
+    '''Stores a population of Schelling agents as parallel arrays.
+
+    Positions, group ids, thresholds and happy flags are kept in typed
+    numpy arrays, one element per agent, and the grid holds the index of
+    the agent occupying each cell (-1 when empty).
+
+    Indexing the store returns an AgentView with Schelling-like access.
+    '''
+    def __init__(self, grid_size, N, similar_wanted = 0.3, seed = None):
+        '''Places N agents on random cells of a grid_size x grid_size grid,
+        see place_agents.'''
+        self.grid_size = grid_size
+        self.N = N
+        self.rng = np.random.default_rng(seed)
+
+        coord_dtype = np.int16 if grid_size <= np.iinfo(np.int16).max else np.int32
+        cells, self.group = place_agents(self.rng, grid_size, N)
+        self.x = (cells // grid_size).astype(coord_dtype)
+        self.y = (cells % grid_size).astype(coord_dtype)
+        self.threshold = np.full(N, similar_wanted, dtype = np.float32)
+        self.happy = np.zeros(N, dtype = bool)
+
+        self.grid = np.full((grid_size, grid_size), -1, dtype = np.int32)
+        self.grid[self.x, self.y] = np.arange(N)
+
+    def __len__(self):
+        return self.N
+
+    def __getitem__(self, i):
+        if not -self.N <= i < self.N:
+            raise IndexError("agent index out of range")
+        return AgentView(self, i % self.N)
+
+    def __iter__(self):
+        for i in range(self.N):
+            yield AgentView(self, i)
+
+    def groups(self):
+        '''Returns the grid as group ids, -1 for empty cells.'''
+        groups = np.full(self.grid.shape, -1, dtype = np.int8)
+        groups[self.x, self.y] = self.group
+        return groups
+
+    def vacancies(self):
+        '''Returns the number of empty cells.'''
+        return self.grid_size*self.grid_size - self.N
+
+    def update_happy(self):
+        '''Checks whether the agents are happy or not.
+
+        Updates the happy flags and returns the indices of the
+        unhappy agents, i.e. the agents that should move.'''
+        similar, occupied = similar_counts(self.groups())
+        self.happy = happy_mask(similar[self.x, self.y],
+                                occupied[self.x, self.y],
+                                self.threshold)
+        return np.flatnonzero(~self.happy)
+
+    def prop_happy(self):
+        '''Returns the proportion of happy and unhappy agents.'''
+        prop_happy = int(np.count_nonzero(self.happy))/self.N
+        return prop_happy, 1 - prop_happy
+
+    def move_unhappy(self, unhappy, synchronous = False):
+        '''Moves the given agents, one at a time in random order, to a
+        random empty cell. Cells vacated earlier in the same call can be
+        chosen by later agents, as with Schelling.move.
+
+        With synchronous = True all agents choose an empty cell at once,
+        each contested cell goes to one of its claimants at random and the
+        others stay (see synchronous_targets).
+
+        Returns the indices of the moved agents, in the order they moved.'''
+        n = self.grid_size
+        order = self.rng.permutation(np.asarray(unhappy, dtype = np.intp))
+        if not len(order):
+            return order
+
+        old_cells = self.x[order].astype(np.intp)*n + self.y[order]
+        vacant = np.flatnonzero(self.grid.ravel() < 0)
+        if not len(vacant):
+            raise ValueError("No place to move!")
+        slots = self.rng.integers(0, len(vacant), len(order))
+        if synchronous:
+            won, new_cells = synchronous_targets(vacant, slots)
+            order, old_cells = order[won], old_cells[won]
+        else:
+            new_cells = serial_targets(vacant, old_cells, slots)
+
+        grid = self.grid.ravel()
+        grid[old_cells] = -1
+        grid[new_cells] = order
+        self.x[order] = new_cells // n
+        self.y[order] = new_cells % n
+        return order
+
+
+class AgentView(object):
+    '''A lightweight view of one agent in an AgentStore, for code that
+    wants Schelling-like access (x, y, color, happy, move ...).'''
+
+    __slots__ = ('store', 'index')
+
+    def __init__(self, store, index):
+        self.store = store
+        self.index = index
+
+    @property
+    def name(self):
+        return "S" + str(self.index)
+
+    @property
+    def x(self):
+        return int(self.store.x[self.index])
+
+    @property
+    def y(self):
+        return int(self.store.y[self.index])
+
+    @property
+    def color(self):
+        return GROUP_COLORS[self.store.group[self.index]]
+
+    @property
+    def percent_similar(self):
+        return float(self.store.threshold[self.index])
+
+    @property
+    def happy(self):
+        return bool(self.store.happy[self.index])
+
+    def position(self):
+        '''Return coordinates of current position.'''
+        return self.x, self.y
+
+    def is_happy(self):
+        '''Checks whether this agent is happy or not, and stores the
+        result in the store's happy flags.'''
+        x, y = self.x, self.y
+        cells = self.store.grid[max(x-1, 0):x+2, max(y-1, 0):y+2]
+        groups = np.where(cells >= 0, self.store.group[cells], -1)
+        occupied = np.count_nonzero(groups >= 0) - 1
+        similar = np.count_nonzero(groups == self.store.group[self.index]) - 1
+        self.store.happy[self.index] = happy_mask(np.array(similar), np.array(occupied),
+                                                  self.store.threshold[self.index])
+        return self.happy
+
+    def move(self):
+        '''Moves the agent to a random empty cell.'''
+        self.store.move_unhappy([self.index])
+
+    def __str__(self):
+        '''String representation when printing object.'''
+        return self.name + ":" + "(" + str(self.x) + "," + str(self.y) + ")"
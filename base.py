@@ -1,6 +1,8 @@
 import random
 import tkinter.messagebox
 
+import numpy as np
+
  
 class Neighbour(dict):
     '''Takes a World object as parameter and returns the neigbours of each x & y coordinates in the world.
@@ -64,76 +66,58 @@ class Neighbour(dict):
         return s
  
  
-class Transform(dict):
-    '''Class that takes a World object as input and sets up a dictionary
-    with both cartesian and tkinter coordinates.
-    '''                          
+class Transform(object):
+    '''Class that takes a World object as input and maps cartesian
+    cell coordinates to tkinter coordinates.
+
+    The mapping is closed-form: an origin, a cell size and a flipped
+    y-axis, i.e. the lower left cell 0,0 (cartesian) is drawn at the
+    bottom of the tkinter canvas.
+    '''
     def __init__(self, world):
-        '''Stores world and set up dictionary containing both
-        cartesian and tkinter coordinates.'''
-        dict.__init__({})
+        '''Stores world, origin and cell size of the transform.'''
         self.world = world
-        self._x_y_dict()
-         
- 
-    def _x_y_dict(self):
-        '''A dictionary consisting of tuples with x, y values.
- 
-        The lower left corner is 0,0 (cartesian) and their
-        respective x, y coordinates in tkinter.'''
-        self._graphics_list()
-        self._xy_coords_orig()
-        self._xy_coords_tkinter()
-         
-         
-        for i in range(len(self.x_y_orig)):
-            self[self.x_y_orig[i]] = self.x_y_tkinter[i]
- 
-    def _xy_coords_orig(self):
-        self.x_y_orig = []
-        for x in range(self.world.grid_size):
-            for y in range(self.world.grid_size):
-                self.x_y_orig.append((x,y))        
- 
-    def _xy_coords_tkinter(self):
-        self.x_y_tkinter = []
-        for key in sorted(self.visual_dict):
-            for i in range(self.world.grid_size):
-                self.x_y_tkinter.append((key,self.visual_dict[key][i]))
- 
-    def _graphics_list(self):
-        '''A method for creating a list/dictionary of which to
-        create a graphics interface from.'''
- 
-        self.visual_list = [[0 for row in range(self.world.grid_size)] for row in range(self.world.grid_size)]
-        for x in range(self.world.grid_size):
-            count = self.world.height - self.world.counter_y
-            for y in range(self.world.grid_size):
-                self.visual_list[x][y] = count
-                count -= self.world.counter_y
- 
-  
-        x = 0
-        self.visual_dict = {}
-        for element in self.visual_list:
-            self.visual_dict[x] = element
-            x += self.world.counter_x
-                 
+        self.grid_size = world.grid_size
+        self.origin_x = 0
+        self.origin_y = world.height
+        self.cell_w = world.counter_x
+        self.cell_h = world.counter_y
+
+    def inside(self, x, y):
+        '''Returns True if cartesian x,y is within the world.'''
+        return 0 <= x < self.grid_size and 0 <= y < self.grid_size
+
     def tkinter_coords(self, x, y):
         '''Returns tkinter x, y values (tuple)
- 
+
         Takes cartesian x,y as parameters.'''
-        try:
-            return self[x,y]
-        except KeyError as err:
-            print(str(err) + " is outside world's coordinate system.")
- 
+        if not self.inside(x, y):
+            print(str((x, y)) + " is outside world's coordinate system.")
+            return None
+        return (self.origin_x + x*self.cell_w,
+                self.origin_y - (y+1)*self.cell_h)
+
+    def tkinter_array(self, x, y):
+        '''Returns tkinter x, y values (two arrays) for whole arrays of
+        cartesian x,y, e.g. all the cells that moved during a tick.
+
+        No bounds checking is done.'''
+        x = np.asarray(x)
+        y = np.asarray(y)
+        return (self.origin_x + x*self.cell_w,
+                self.origin_y - (y+1)*self.cell_h)
+
+    def x_y_orig(self):
+        '''Returns a list of all cartesian x,y values (tuple),
+        column by column.'''
+        return [(x,y) for x in range(self.grid_size) for y in range(self.grid_size)]
+
     def __str__(self):
-        '''Prints the coordinates dictionary.
-        'keys' are cartesian while 'values' are tkinter.'''
+        '''Prints the coordinates mapping.
+        Cartesian values to the left and tkinter to the right.'''
         s = ""
-        for key in sorted(self):
-            s += str(key) + ":" + str(self[key]) + "\n"
+        for x, y in self.x_y_orig():
+            s += str((x,y)) + ":" + str(self.tkinter_coords(x,y)) + "\n"
         return s
  
 class World(object):
@@ -165,7 +149,7 @@ class World(object):
  
     def x_y_list(self):
         '''Returns the list of the world's x,y coordinates (cartesian).'''
-        return self.coordinates.x_y_orig
+        return self.coordinates.x_y_orig()
  
     def inhabited(self):
         '''Returns the list of cells with patches.'''
@@ -0,0 +1,110 @@
+import contextlib
+import hashlib
+import json
+import os
+import tempfile
+
+import numpy as np
+
+
+# Source files whose content decides the results of a run.
+CODE_FILES = ('agents.py', 'sweep.py')
+
+
+def code_version(files = CODE_FILES):
+    '''Returns a hash of the simulation source code, so cached results
+    are not reused after the code has changed.'''
+    digest = hashlib.sha256()
+    here = os.path.dirname(os.path.abspath(__file__))
+    for name in files:
+        with open(os.path.join(here, name), 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+class ResultCache(object):
+    '''A local on-disk cache of run results.
+
+    Results are stored one file per configuration, named by a hash of
+    the configuration and the code version. The cache is bounded by
+    max_bytes, the least recently used results are evicted first.
+    '''
+    def __init__(self, path = None, max_bytes = 256*2**20, version = None):
+        if path is None:
+            path = os.path.join(os.path.expanduser('~'), '.cache', 'eytest')
+        os.makedirs(path, exist_ok = True)
+        self.path = path
+        self.max_bytes = max_bytes
+        self.version = version if version is not None else code_version()
+
+    def key(self, config):
+        '''Returns the content address of a configuration (dict).
+
+        numpy scalars (e.g. seeds from np.arange) hash the same as the
+        equal Python values.'''
+        s = json.dumps(config, sort_keys = True, default = lambda v: v.item()) + self.version
+        return hashlib.sha256(s.encode()).hexdigest()
+
+    def _file(self, config):
+        return os.path.join(self.path, self.key(config) + '.npz')
+
+    def __contains__(self, config):
+        return os.path.exists(self._file(config))
+
+    def get(self, config):
+        '''Returns the stored result (dict of arrays) of a configuration,
+        or None if it is not in the cache.'''
+        filename = self._file(config)
+        try:
+            with np.load(filename) as data:
+                result = dict(data)
+        except (OSError, ValueError):
+            return None
+        # Mark as recently used, another process may have evicted it since
+        with contextlib.suppress(FileNotFoundError):
+            os.utime(filename)
+        return result
+
+    def put(self, config, result):
+        '''Stores a result (dict of arrays) and evicts old results
+        if the cache is too big.'''
+        fd, tmp = tempfile.mkstemp(dir = self.path, suffix = '.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.savez_compressed(f, **result)
+            os.replace(tmp, self._file(config))
+        except BaseException:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(tmp)
+            raise
+        self.evict()
+
+    def evict(self):
+        '''Removes the least recently used results until the cache
+        is smaller than max_bytes.
+
+        Other processes may evict the same files at the same time, files
+        that are already gone are skipped.'''
+        entries = []
+        for entry in os.scandir(self.path):
+            if entry.name.endswith('.npz'):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for mtime, size, path in entries)
+        for mtime, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(path)
+            total -= size
+
+    def clear(self):
+        '''Removes all results from the cache, and temporary files
+        left behind by writes that were interrupted.'''
+        for entry in os.scandir(self.path):
+            if entry.name.endswith(('.npz', '.tmp')):
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(entry.path)
@@ -0,0 +1,99 @@
+import numpy as np
+
+from agents import padded_counts, happy_mask, serial_targets, synchronous_targets, place_agents
+
+
+class Ensemble(object):
+    '''R replicas of the same model advanced together.
+
+    The replicas are stacked in one (R, n, n) array of group ids (-1 for
+    empty cells), kept inside a padded array with a border of empty
+    cells. Happiness is evaluated for all replicas in one vectorized pass
+    over that shared padded array. The moves follow the same rule as
+    AgentStore.move_unhappy, each replica only using its own vacancies.
+    '''
+    def __init__(self, replicas, grid_size, N, similar_wanted = 0.3, seed = None):
+        '''Places N agents on random cells in each replica, see
+        agents.place_agents.'''
+        self.replicas = replicas
+        self.grid_size = grid_size
+        self.N = N
+        self.similar_wanted = similar_wanted
+        self.rng = np.random.default_rng(seed)
+
+        self._padded = np.full((replicas, grid_size+2, grid_size+2), -1, dtype = np.int8)
+        self.groups = self._padded[:, 1:-1, 1:-1]
+        # Cells of the padded array that are part of the world
+        self._interior = np.zeros(self._padded.shape, dtype = bool)
+        self._interior[:, 1:-1, 1:-1] = True
+        for r in range(replicas):
+            cells, group = place_agents(self.rng, grid_size, N)
+            self.groups[r, cells // grid_size, cells % grid_size] = group
+        self.happy = np.zeros(self.groups.shape, dtype = bool)
+
+    def update_happy(self):
+        '''Checks whether the agents of all replicas are happy or not.
+
+        Returns the (R, n, n) boolean array of happy agents, empty
+        cells are False.'''
+        similar, occupied = padded_counts(self._padded)
+        self.happy = happy_mask(similar, occupied, self.similar_wanted) & (self.groups >= 0)
+        return self.happy
+
+    def prop_happy(self):
+        '''Returns the proportion of happy agents in each replica.'''
+        return np.count_nonzero(self.happy, axis = (1, 2))/self.N
+
+    def move_unhappy(self, synchronous = False):
+        '''Moves the unhappy agents of each replica, one at a time in
+        random order, to a random empty cell of the same replica.
+        With synchronous = True they all move at once, as in
+        AgentStore.move_unhappy.
+
+        The replicas are independent, so the moves of all of them are
+        worked out in one call to serial_targets, with each replica
+        picking slots from its own part of the vacancy array. Cells are
+        numbered by their flat index in the padded array.'''
+        cells = self._padded.ravel()
+        per_replica = cells.size // self.replicas
+
+        unhappy = np.zeros(self._padded.shape, dtype = bool)
+        unhappy[:, 1:-1, 1:-1] = (self.groups >= 0) & ~self.happy
+        old_cells = np.flatnonzero(unhappy)
+        if not len(old_cells):
+            return
+        vacant = np.flatnonzero((self._padded < 0) & self._interior)
+        vac_count = np.bincount(vacant // per_replica, minlength = self.replicas)
+        vac_start = np.cumsum(vac_count) - vac_count
+
+        # Random order within each replica
+        old_r = old_cells // per_replica
+        order = np.argsort(old_r + self.rng.random(len(old_cells)))
+        old_cells, old_r = old_cells[order], old_r[order]
+        if not vac_count[old_r].all():
+            raise ValueError("No place to move!")
+        slots = vac_start[old_r] + (self.rng.random(len(old_r))*vac_count[old_r]).astype(np.intp)
+        if synchronous:
+            won, new_cells = synchronous_targets(vacant, slots)
+            old_cells = old_cells[won]
+        else:
+            new_cells = serial_targets(vacant, old_cells, slots)
+
+        moving = cells[old_cells]
+        cells[old_cells] = -1
+        cells[new_cells] = moving
+
+    def run(self, ticks, synchronous = False):
+        '''Runs all replicas for at most ticks ticks, stopping early
+        when every agent in every replica is happy.
+
+        Returns the proportion of happy agents, an array with one row
+        per tick and one column per replica.'''
+        trace = []
+        for tick in range(ticks+1):
+            self.update_happy()
+            trace.append(self.prop_happy())
+            if (trace[-1] == 1).all():
+                break
+            self.move_unhappy(synchronous)
+        return np.array(trace)
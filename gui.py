@@ -1,7 +1,8 @@
-from tkinter import Frame, Canvas, Button, Label, Scale 
+from tkinter import Frame, Canvas, Button, Label, Scale, Checkbutton, IntVar 
 import tkinter.messagebox
-from base import Neighbour, Transform, World, Patch, Schelling, Plotcoords
-import random
+from base import World
+from plot import TimeSeriesPlot
+from agents import AgentStore, GROUP_COLORS
  
 class Visual(Frame):
     '''Class that takes a world as argument and present it graphically
@@ -33,14 +34,9 @@ class Visual(Frame):
                                      
         self._buttonPane.grid(row = 1, column = 0, sticky = 'n')
  
-        # A temp pane where graph is located, just for cosmetic reasons
-        width, height = 425, 350          
-        self._graph = Canvas(self,
-                             width = width,
-                             height = height,
-                             background = "black")
-        self._graph.configure(relief = 'sunken', border = 2)
- 
+        # The pane where the graph is located, reused across runs
+        self._graph = TimeSeriesPlot(self)
+        self._graph.configure(relief = 'sunken')
         self._graph.grid(row = 3, column = 0)        
  
  
@@ -61,35 +57,8 @@ class Visual(Frame):
         self._buttons()     # Create button widgets
          
     def _plot_setup(self, time):
-        '''Method for crudely annotating the graph window.'''               
-        time = time
- 
-        # Main plot
-        width, height = 425, 350
-        y0 = -time/10 
-        self._graph = Canvas(self, width = width, height = height, background = "black", borderwidth=5)
-        self._graph.grid(row = 3, column = 0)         
-        self.trans = Plotcoords(width, height, y0, -0.2, time, 1.3) 
-         
-        x,y = self.trans.screen(time//2,1.2)
-        x1,y1 = self.trans.screen(time//2,1.13)
-        self._graph.create_text(x,y,  text = "% Happy", fill = "yellow",font = "bold 12")
-        self._graph.create_text(x1,y1,  text = "% Unhappy", fill = "blue",font = "bold 12")
- 
-        # Line x-axis  
-        x, y  = self.trans.screen((-5*(time/100)),-0.05)  
-        x1, y  = self.trans.screen(time,-0.05)
-        self._graph.create_line(x,y,x1,y, fill = "white", width=1.5)
-         
-        # Text x-axis
-        x_text, y_text  = self.trans.screen(time/2,-0.15)        
-        self._graph.create_text(x_text,y_text,  text = "Time", fill = "white",font = "bold 12")
-         
-         
-        # Liney-axis        
-        x, y  = self.trans.screen((-0.5*(time/100)),-0.05) 
-        x, y1  = self.trans.screen((-5*(time/100)), 1)     
-        self._graph.create_line(x, y, x, y1, fill = "white", width=1.5)
+        '''Method for clearing and annotating the graph window.'''               
+        self._graph.reset(time)
  
     def _entry(self):
         '''Method for creating widgets for collecting user input.'''
@@ -167,6 +136,23 @@ class Visual(Frame):
         self._Similar.set(0.76) 
         self._Similar.grid(row = 2, column = 2)
  
+        # Synchronous (simultaneous) moves
+        self._Synchronous_label = Label(self._entryPane,
+                                        anchor = 'w',
+                                        justify = 'left',
+                                        text = "Synchronous:",
+                                        relief = 'raised',
+                                        width = 12,
+                                        height = 1,
+                                        font = "bold 20")
+ 
+        self._Synchronous_label.grid(row = 3, column = 1, ipady=14)
+ 
+        self._Synchronous = IntVar(value = 0)
+        self._Synchronous_check = Checkbutton(self._entryPane,
+                                              variable = self._Synchronous)
+        self._Synchronous_check.grid(row = 3, column = 2)
+ 
  
     def _buttons(self):
         '''Method for creating button widgets for setting up, running and plotting results from simulation.'''
@@ -244,6 +230,7 @@ class Visual(Frame):
         self.N = int(self._N.get())
         self.Ticks = int(self._Ticks.get())
         self.similar = float(self._Similar.get())
+        self.synchronous = bool(self._Synchronous.get())
         self.data = []  
         self.tick_counter = 0
         self._Tick_counter1['text'] = str(self.tick_counter)
@@ -251,7 +238,6 @@ class Visual(Frame):
         self.grid_size = 30 
         self.world = World(750,750, self.grid_size)
         self.create_turtles()
-        self.neighbouring_turtles()
         self.draw_turtles()
          
     def _go(self):
@@ -270,37 +256,11 @@ class Visual(Frame):
  
             self.data_collection(self.tick_counter, prop_happy, prop_unhappy) 
  
-            if self.tick_counter >= 1:
-                 
-                # HAPPY values (%)
-                x0 = self.tick_counter-1
-                x1 = self.tick_counter
- 
-                # Collecting values from stoblue data
-                y0 = self.data[self.tick_counter-1][1]
-                y1 = self.data[self.tick_counter][1]
- 
-                # Transforming to tkinter
-                x1, y1 = self.trans.screen(x1, y1)
-                x0,y0 = self.trans.screen(x0,y0)
-                self._graph.create_line(x0, y0, x1, y1 ,fill = "yellow", width=1.3, tag = "happy") # Draw "happy lines
-                 
-                # UNHAPPY values (%)
-                x0 = self.tick_counter-1
-                x1 = self.tick_counter
- 
-                # Collecting values from stored data
-                y0 = self.data[self.tick_counter-1][2]
-                y1 = self.data[self.tick_counter][2]
- 
-                # Transforming to tkinter
-                x1, y1 = self.trans.screen(x1, y1)
-                x0,y0 = self.trans.screen(x0,y0)
-                self._graph.create_line(x0,y0, x1, y1 ,fill = "blue", width=1.1, tag = "unhappy") # Draw unhappy lines                  
+            # Plot happy/unhappy values (%)
+            self._graph.add(self.tick_counter, happy = prop_happy, unhappy = prop_unhappy)
              
             if prop_happy < 1:                
                 self.turtle_move(turtles_unhappy)                            
-                self.update_neighbours()                                     
                 self.tick_counter += 1
                 self.canvas.after(0, self._go())
  
@@ -316,50 +276,33 @@ class Visual(Frame):
  
  
     def turtle_move(self, unhappy_turtles):
-        '''Moves all the unhappy turtles (randomly).'''
-         
-        while unhappy_turtles:
-            i = random.randint(0, len(unhappy_turtles)-1)
-            turtle = unhappy_turtles.pop(i)
-            turtle.move(self)
- 
-    def update_neighbours(self):
-        '''Updates the turtles neigbour attributes. Called
-        after all turtles have moved.'''
-        for turtle in self.turtles:
-            turtle.update_neighbours()
+        '''Moves all the unhappy turtles (randomly) and redraws
+        the ones that moved.'''
+        if not self.turtles.vacancies():
+            tkinter.messagebox.showwarning("Warning", "No place to move!")
+            self.movement_possible = False
+            self.master.destroy()
+            quit()
+
+        moved = self.turtles.move_unhappy(unhappy_turtles, self.synchronous)
+
+        # Map all moved turtles to tkinter at once
+        coords = self.world.coordinates
+        x_draw, y_draw = coords.tkinter_array(self.turtles.x[moved], self.turtles.y[moved])
+        for i, x, y in zip(moved.tolist(), x_draw.tolist(), y_draw.tolist()):
+            self.canvas.coords("S"+str(i), x, y, x+coords.cell_w, y+coords.cell_h)
  
     def check_satisfaction(self):
         '''Checks to see if turtles are happy or not.
-        Returns a list of unhappy turtles, i.e. turtles
+        Returns the indices of unhappy turtles, i.e. turtles
         that should move.
  
         Called before the move method.'''
-         
-        for turtle in self.turtles:
-            turtle.is_happy()
-         
-        unhappy_turtles = []
-        for element in self.turtles:
-            if not element.happy:
-                unhappy_turtles.append(element)
- 
-        return unhappy_turtles
+        return self.turtles.update_happy()
  
     def calc_prop_happy(self,i):
         '''Calculates the proportion of happy turtles.'''
-        happy = 0
-        unhappy = 0
-         
-        for turtle in self.turtles:
-            if turtle.happy:
-                happy += 1
-            else:
-                unhappy += 1
-        prop_happy = happy/len(self.turtles)
-        prop_unhappy = unhappy/len(self.turtles)
- 
-        return prop_happy, prop_unhappy
+        return self.turtles.prop_happy()
          
     def data_collection(self, i, prop_happy, prop_unhappy):
         '''Method for collecting data at each tick.'''
@@ -371,47 +314,22 @@ class Visual(Frame):
 # ------------------------------------------------------ #
  
     def create_turtles(self):
-        '''Method for creating a new list of turtles.
+        '''Method for creating a new store of turtles.
  
-        Upon creation they are registered in the World object.'''
+        The store keeps positions, colors and happiness of
+        all turtles in arrays.'''
         if self.N <= self.grid_size*self.grid_size:
-            counter = 0
-            self.turtles = []
-            while counter < self.N:
-                             
-                s = "S"+str(counter)
-                if counter <= int(self.N/2):
-                    color = "yellow"
-                else:
-                    color = "blue"
-                 
-                x = random.randint(0, self.grid_size-1)
-                y = random.randint(0, self.grid_size-1)
- 
-                if not self.world.patch_list[x][y]:  
-                    new_turtle = Schelling(world = self.world,
-                                           x = x,
-                                           y = y,
-                                           s = s,
-                                           color = color,
-                                           similar_wanted = self.similar)
- 
-                    self.world.register(new_turtle)  
-                    counter += 1
-                    self.turtles.append(new_turtle)   
+            self.turtles = AgentStore(self.grid_size, self.N, self.similar)
         else:
             print("Number of turtles exceeds world!")
  
     def draw_turtles(self):
         '''Method for drawing turtles on canvas.
  
-           Calls each turtle's own method for drawing.'''
-        for turtle in self.turtles:
-            turtle.draw(self.canvas)
- 
-    def neighbouring_turtles(self):
-        '''Method for updating turtles' neighbours.
- 
-           Calls on each turtle's own method for updating neighbours.'''
-        for turtle in self.turtles:
-            turtle.get_neighbouring_patches()
\ No newline at end of file
+           Maps all turtles to tkinter coordinates at once.'''
+        coords = self.world.coordinates
+        x_draw, y_draw = coords.tkinter_array(self.turtles.x, self.turtles.y)
+        for i, x, y, group in zip(range(len(self.turtles)), x_draw.tolist(),
+                                  y_draw.tolist(), self.turtles.group.tolist()):
+            self.canvas.create_rectangle(x, y, x+coords.cell_w, y+coords.cell_h,
+                                         fill = GROUP_COLORS[group], tag = "S"+str(i))
@@ -0,0 +1,287 @@
+import argparse
+import os
+import resource
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from agents import padded_counts, happy_mask, serial_targets
+
+
+# numpy's hypergeometric needs ngood and nbad below this.
+HYPERGEOMETRIC_LIMIT = 10**9
+
+
+def hypergeometric(rng, ngood, nbad, nsample):
+    '''Draws how many of nsample items, taken without replacement from
+    ngood good and nbad bad items, are good. As rng.hypergeometric, but
+    also for ngood or nbad of 10**9 and above.
+
+    Populations that big are approximated: with a binomial when the
+    sample is at most 1% of the population, otherwise with a normal
+    with the hypergeometric mean and variance.'''
+    if not nsample or not ngood:
+        return 0
+    if not nbad:
+        return nsample
+    if ngood < HYPERGEOMETRIC_LIMIT and nbad < HYPERGEOMETRIC_LIMIT:
+        return int(rng.hypergeometric(ngood, nbad, nsample))
+
+    total = ngood + nbad
+    p = ngood/total
+    if 100*nsample <= total:
+        x = rng.binomial(nsample, p)
+    else:
+        var = nsample*p*(1 - p)*(total - nsample)/(total - 1)
+        x = round(rng.normal(nsample*p, var**0.5))
+    return int(min(max(x, nsample - nbad, 0), nsample, ngood))
+
+
+def split_counts(rng, sizes, nsample):
+    '''Draws how many of nsample items, taken without replacement from
+    parts of the given sizes, come from each part.
+
+    The parts are split in halves recursively with one hypergeometric
+    draw per split, so each draw only spans the parts still being split
+    and stays exact below HYPERGEOMETRIC_LIMIT per half.'''
+    starts = np.concatenate(([0], np.cumsum(sizes, dtype = object)))
+    counts = [0]*len(sizes)
+
+    def split(lo, hi, k):
+        if hi - lo == 1:
+            counts[lo] = k
+            return
+        mid = (lo + hi)//2
+        k_left = hypergeometric(rng, starts[mid] - starts[lo], starts[hi] - starts[mid], k)
+        split(lo, mid, k_left)
+        split(mid, hi, k - k_left)
+
+    if len(sizes):
+        split(0, len(sizes), nsample)
+    return counts
+
+
+class MemmapWorld(object):
+    '''A world whose grid and agent arrays live in numpy.memmap files,
+    for worlds too big to hold in memory.
+
+    The files in path are:
+
+        groups.dat - the n x n grid of group ids (int8, -1 for empty cells)
+        happy.dat  - the n x n grid of happy flags
+        vacant.dat - the empty cells (flat indices into the grid)
+        movers.dat - the cells of the unhappy agents found by update_happy
+        order.dat  - the unhappy agents in the random order they move
+
+    Only chunks of about chunk_cells cells are held in memory at a time.
+    A tick has the same semantics as AgentStore: happiness is evaluated
+    for all agents first, then the unhappy agents move one at a time in
+    random order to a random empty cell.
+    '''
+    def __init__(self, path, grid_size, N, similar_wanted = 0.3, seed = None,
+                 chunk_cells = 2**22):
+        '''Creates the files and places N agents on random cells, the first
+        half (and one more) in group 0, the rest in group 1.'''
+        if N > grid_size*grid_size:
+            raise ValueError("Number of turtles exceeds world!")
+
+        os.makedirs(path, exist_ok = True)
+        self.path = path
+        self.grid_size = grid_size
+        self.N = N
+        self.similar_wanted = similar_wanted
+        self.rng = np.random.default_rng(seed)
+        self.chunk_rows = max(1, chunk_cells // grid_size)
+        self.n_happy = 0
+        self.n_unhappy = 0
+
+        n_cells = grid_size*grid_size
+        self.groups = self._memmap('groups', np.int8, (grid_size, grid_size))
+        self.happy = self._memmap('happy', bool, (grid_size, grid_size))
+        self.vacant = self._memmap('vacant', np.int64, (n_cells - N,))
+        self.movers = self._memmap('movers', np.int64, (N,))
+        self.order = self._memmap('order', np.int64, (N,))
+        self._populate()
+
+    def _memmap(self, name, dtype, shape):
+        '''Creates a memmap file, empty arrays get a file of one element.'''
+        size = int(np.prod(shape))
+        filename = os.path.join(self.path, name + '.dat')
+        mm = np.memmap(filename, dtype = dtype, mode = 'w+', shape = (max(size, 1),))
+        return mm[:size].reshape(shape)
+
+    def _chunks(self):
+        '''Yields the first and last (exclusive) row of each chunk.'''
+        for r0 in range(0, self.grid_size, self.chunk_rows):
+            yield r0, min(r0 + self.chunk_rows, self.grid_size)
+
+    def _populate(self):
+        '''Places the agents chunk by chunk. How many agents (and how many
+        of group 0) go in each chunk is drawn by split_counts, so the
+        result is the same as placing all N at once.'''
+        n = self.grid_size
+        chunks = list(self._chunks())
+        agents = split_counts(self.rng, [(r1 - r0)*n for r0, r1 in chunks], self.N)
+        group0 = split_counts(self.rng, agents, min(self.N, self.N//2 + 1))
+        n_vacant = 0
+
+        for (r0, r1), k, k0 in zip(chunks, agents, group0):
+            cells = (r1 - r0)*n
+            chunk = np.full(cells, -1, dtype = np.int8)
+            placed = self.rng.choice(cells, k, replace = False)
+            chunk[placed[:k0]] = 0
+            chunk[placed[k0:]] = 1
+            self.groups[r0:r1] = chunk.reshape(r1 - r0, n)
+
+            empty = np.flatnonzero(chunk < 0) + r0*n
+            self.vacant[n_vacant:n_vacant + len(empty)] = empty
+            n_vacant += len(empty)
+
+    def update_happy(self):
+        '''Checks whether the agents are happy or not, one chunk of rows
+        at a time. Each chunk is read with one halo row above and below
+        so the neighbours at its edges are counted.
+
+        Writes the happy flags and the cells of the unhappy agents to
+        their files, and returns the number of unhappy agents.'''
+        n = self.grid_size
+        self.n_happy = 0
+        self.n_unhappy = 0
+
+        for r0, r1 in self._chunks():
+            lo, hi = max(r0 - 1, 0), min(r1 + 1, n)
+            padded = np.full((r1 - r0 + 2, n + 2), -1, dtype = np.int8)
+            padded[lo - r0 + 1:hi - r0 + 1, 1:-1] = self.groups[lo:hi]
+            groups = padded[1:-1, 1:-1]
+
+            similar, occupied = padded_counts(padded)
+            happy = happy_mask(similar, occupied, self.similar_wanted) & (groups >= 0)
+            self.happy[r0:r1] = happy
+
+            movers = np.flatnonzero((groups >= 0) & ~happy) + r0*n
+            self.movers[self.n_unhappy:self.n_unhappy + len(movers)] = movers
+            self.n_unhappy += len(movers)
+            self.n_happy += int(np.count_nonzero(happy))
+        return self.n_unhappy
+
+    def prop_happy(self):
+        '''Returns the proportion of happy and unhappy agents.'''
+        prop_happy = self.n_happy/self.N
+        return prop_happy, 1 - prop_happy
+
+    def _shuffle_movers(self):
+        '''Writes the unhappy agents to order in a uniformly random order,
+        without holding them all in memory.
+
+        Each agent is sent to one of B random buckets (B chunks worth),
+        then every bucket is shuffled on its own when it is moved.
+        Returns the start and size of each bucket in order.'''
+        m = self.n_unhappy
+        block = self.chunk_rows*self.grid_size
+        starts = range(0, m, block)
+        n_buckets = len(starts)
+
+        # How many agents of each chunk go to each bucket
+        counts = np.array([self.rng.multinomial(min(block, m - s), [1/n_buckets]*n_buckets)
+                           for s in starts])
+        sizes = counts.sum(axis = 0)
+        bucket_start = np.cumsum(sizes) - sizes
+        offsets = bucket_start + np.cumsum(counts, axis = 0) - counts
+
+        for c, s in enumerate(starts):
+            chunk = self.rng.permutation(self.movers[s:min(s + block, m)])
+            for b, piece in enumerate(np.split(chunk, np.cumsum(counts[c])[:-1])):
+                self.order[offsets[c, b]:offsets[c, b] + len(piece)] = piece
+        return bucket_start, sizes
+
+    def move_unhappy(self):
+        '''Moves the unhappy agents found by update_happy, one at a time
+        in random order, to a random empty cell.
+
+        The agents are processed in blocks of that order. The vacancy file
+        is updated by serial_targets between blocks, so every block sees
+        the cells vacated by the blocks before it.'''
+        if not self.n_unhappy:
+            return
+        if not len(self.vacant):
+            raise ValueError("No place to move!")
+
+        cells = self.groups.reshape(-1)
+        for start, size in zip(*self._shuffle_movers()):
+            old_cells = self.rng.permutation(self.order[start:start + size])
+            slots = self.rng.integers(0, len(self.vacant), len(old_cells))
+            new_cells = serial_targets(self.vacant, old_cells, slots)
+
+            moving = cells[old_cells]
+            cells[old_cells] = -1
+            cells[new_cells] = moving
+
+    def run(self, ticks):
+        '''Runs the model for at most ticks ticks, stopping early when
+        every agent is happy.
+
+        Returns the metrics trace (tick, prop happy, prop unhappy).'''
+        trace = []
+        for tick in range(ticks + 1):
+            self.update_happy()
+            prop_happy, prop_unhappy = self.prop_happy()
+            trace.append((tick, prop_happy, prop_unhappy))
+            if prop_happy == 1:
+                break
+            self.move_unhappy()
+        self.flush()
+        return np.array(trace)
+
+    def flush(self):
+        '''Writes any changes in the memmaps to disk.'''
+        for array in (self.groups, self.happy, self.vacant, self.movers, self.order):
+            if isinstance(array.base, np.memmap):
+                array.base.flush()
+
+
+def main(argv = None):
+    '''Runs a MemmapWorld from the command line, printing the proportion
+    of happy agents after each tick and the peak memory use (RSS).
+
+    Without --path the files go to a temporary directory that is removed
+    afterwards.'''
+    parser = argparse.ArgumentParser(description = "Schelling model on a memory-mapped grid.")
+    parser.add_argument('--size', type = int, default = 31623,
+                        help = "grid size n, the world has n x n cells")
+    parser.add_argument('--density', type = float, default = 0.9,
+                        help = "proportion of cells with an agent")
+    parser.add_argument('--similar', type = float, default = 0.3,
+                        help = "proportion of similar neighbours wanted")
+    parser.add_argument('--ticks', type = int, default = 10)
+    parser.add_argument('--chunk-cells', type = int, default = 2**22,
+                        help = "cells held in memory at a time")
+    parser.add_argument('--path', help = "directory for the memmap files")
+    parser.add_argument('--seed', type = int)
+    args = parser.parse_args(argv)
+
+    path = args.path or tempfile.mkdtemp()
+    try:
+        start = time.time()
+        N = int(args.density*args.size*args.size)
+        world = MemmapWorld(path, args.size, N, args.similar, args.seed, args.chunk_cells)
+        print('{} cells, {} agents, set up in {:.1f} s'.format(args.size*args.size, N,
+                                                             time.time() - start))
+        for tick in range(args.ticks + 1):
+            world.update_happy()
+            prop_happy, prop_unhappy = world.prop_happy()
+            print('tick {}: {:.2%} happy ({:.1f} s)'.format(tick, prop_happy, time.time() - start))
+            if prop_happy == 1:
+                break
+            if tick < args.ticks:
+                world.move_unhappy()
+        world.flush()
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        print('peak RSS {:.0f} MB'.format(peak/1024))
+    finally:
+        if not args.path:
+            shutil.rmtree(path)
+
+if __name__ == '__main__':
+    main()
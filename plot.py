@@ -0,0 +1,95 @@
+from tkinter import Canvas
+from base import Plotcoords
+
+
+class TimeSeriesPlot(Canvas):
+    '''A canvas plotting time series, e.g. % happy over time.
+
+    Each series is a single polyline that is updated in place with
+    coords(). When a series has more than max_points points every other
+    point is dropped and only every 2nd (4th, 8th ...) tick is kept from
+    then on, so the number of canvas items and points stays bounded no
+    matter how long the run is. The same canvas is reused across runs,
+    see reset().
+    '''
+    def __init__(self, master, width = 425, height = 350, max_points = 256,
+                 series = (("happy", "% Happy", "yellow", 1.3),
+                           ("unhappy", "% Unhappy", "blue", 1.1))):
+        '''series is a sequence of (name, label, color, line width).'''
+        Canvas.__init__(self, master,
+                        width = width,
+                        height = height,
+                        background = "black",
+                        borderwidth = 5)
+        self.width = width
+        self.height = height
+        self.max_points = max_points
+        self.series = series
+        self.reset(100)
+
+    def reset(self, time):
+        '''Clears the plot and annotates it for a run of length time.'''
+        self.delete('all')
+        self.trans = Plotcoords(self.width, self.height, -time/10, -0.2, time, 1.3)
+
+        for i, (name, label, color, width) in enumerate(self.series):
+            x, y = self.trans.screen(time//2, 1.2 - 0.07*i)
+            self.create_text(x, y, text = label, fill = color, font = "bold 12")
+
+        # Line x-axis
+        x, y = self.trans.screen((-5*(time/100)), -0.05)
+        x1, y = self.trans.screen(time, -0.05)
+        self.create_line(x, y, x1, y, fill = "white", width = 1.5)
+
+        # Text x-axis
+        x_text, y_text = self.trans.screen(time/2, -0.15)
+        self.create_text(x_text, y_text, text = "Time", fill = "white", font = "bold 12")
+
+        # Line y-axis
+        x, y = self.trans.screen((-0.5*(time/100)), -0.05)
+        x, y1 = self.trans.screen((-5*(time/100)), 1)
+        self.create_line(x, y, x, y1, fill = "white", width = 1.5)
+
+        # One polyline per series, hidden until it has two points
+        self._lines = {}
+        self._points = {}
+        self._last = {}
+        for name, label, color, width in self.series:
+            self._lines[name] = self.create_line(0, 0, 0, 0, fill = color, width = width,
+                                                 tag = name, state = 'hidden')
+            self._points[name] = []
+        self._count = 0
+        self._stride = 1
+
+    def add(self, time, **values):
+        '''Adds a point at time for each series given as keyword,
+        e.g. add(3, happy = 0.4, unhappy = 0.6).'''
+        keep = self._count % self._stride == 0
+        self._count += 1
+
+        for name, value in values.items():
+            point = self.trans.screen(time, value)
+            points = self._points[name]
+            if keep:
+                points.append(point)
+                self._last[name] = None
+            else:
+                self._last[name] = point
+
+        if len(next(iter(self._points.values()))) > self.max_points:
+            for name in self._points:
+                self._points[name] = self._points[name][::2]
+            self._stride *= 2
+
+        for name in values:
+            self._redraw(name)
+
+    def _redraw(self, name):
+        '''Moves the polyline of a series to its current points.'''
+        points = list(self._points[name])
+        if self._last[name] is not None:
+            points.append(self._last[name])
+        if len(points) < 2:
+            return
+        self.coords(self._lines[name], *[c for point in points for c in point])
+        self.itemconfigure(self._lines[name], state = 'normal')
@@ -0,0 +1,108 @@
+import itertools
+
+import numpy as np
+
+from agents import AgentStore
+from cache import ResultCache
+
+
+def simulate(N, grid_size, similar_wanted, ticks, seed = None, synchronous = False,
+             frames = None):
+    '''Runs the model without graphics, the same way as Visual._go.
+
+    synchronous selects the update rule, see AgentStore.move_unhappy.
+    frames is an optional render.FrameWriter the grid is submitted to
+    at each tick, the final grid is always submitted.
+
+    Returns a dict with the metrics trace (tick, prop happy, prop unhappy)
+    for each tick and the final grid of group ids (-1 for empty cells).'''
+    turtles = AgentStore(grid_size, N, similar_wanted, seed)
+    trace = []
+    for tick in range(ticks+1):
+        if frames is not None:
+            frames.submit(tick, turtles.groups())
+        unhappy = turtles.update_happy()
+        prop_happy, prop_unhappy = turtles.prop_happy()
+        trace.append((tick, prop_happy, prop_unhappy))
+        if prop_happy == 1:
+            break
+        turtles.move_unhappy(unhappy, synchronous)
+    else:
+        # Ran out of ticks, the final grid is after the last moves
+        tick += 1
+
+    if frames is not None and (tick > ticks or tick % frames.every):
+        frames.submit(tick, turtles.groups(), force = True)
+
+    return {'trace': np.array(trace), 'groups': turtles.groups()}
+
+
+# Default for the cache argument of run() and sweep(): the shared default_cache().
+# Pass cache = None to run without caching.
+DEFAULT = object()
+
+# Shared by all runs that don't pass their own cache, see default_cache().
+_default_cache = None
+
+
+def default_cache():
+    '''Returns the ResultCache shared by runs, created on first use.'''
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = ResultCache()
+    return _default_cache
+
+
+def run(config, cache = DEFAULT):
+    '''Runs one configuration (dict of simulate's arguments).
+
+    Results of seeded runs are looked up in and stored to cache, by
+    default the shared default_cache(). cache = None turns caching off.'''
+    if cache is DEFAULT:
+        cache = default_cache()
+    cacheable = cache is not None and config.get('seed') is not None
+    if cacheable:
+        result = cache.get(config)
+        if result is not None:
+            return result
+
+    result = simulate(**config)
+    if cacheable:
+        cache.put(config, result)
+    return result
+
+
+def sweep(N, grid_size, similar_wanted, seeds, ticks = 500, synchronous = False,
+          cache = DEFAULT):
+    '''Runs every combination of the given values of N, grid_size,
+    similar_wanted and seeds (sequences). Cells already in cache are
+    not run again.
+
+    cache is as for run(): the shared default_cache() unless given,
+    None runs every cell without caching.
+
+    Returns a list of (config, result).'''
+    results = []
+    for n, size, similar, seed in itertools.product(N, grid_size, similar_wanted, seeds):
+        config = {'N': n,
+                  'grid_size': size,
+                  'similar_wanted': similar,
+                  'ticks': ticks,
+                  'seed': seed,
+                  'synchronous': synchronous}
+        results.append((config, run(config, cache)))
+    return results
+
+
+def main():
+    results = sweep(N = [400, 800],
+                    grid_size = [30],
+                    similar_wanted = [0.3, 0.5, 0.76],
+                    seeds = range(3))
+    for config, result in results:
+        tick, prop_happy, prop_unhappy = result['trace'][-1]
+        print('N={N}, similar wanted={similar_wanted}, seed={seed}: '.format(**config) +
+              '{:.0%} happy after {} ticks'.format(prop_happy, int(tick)))
+
+if __name__ == '__main__':
+    main()
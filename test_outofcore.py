@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from agents import similar_counts, happy_mask
+from outofcore import HYPERGEOMETRIC_LIMIT, MemmapWorld, split_counts
+
+
+def group_counts(world):
+    '''Returns the number of empty cells and of agents in each group.'''
+    counts = np.zeros(3, dtype = np.int64)
+    for r0, r1 in world._chunks():
+        counts += np.bincount(world.groups[r0:r1].ravel() + 1, minlength = 3)
+    return counts
+
+
+@pytest.mark.parametrize('chunk_cells', [30, 97, 10**6])
+def test_populate(tmp_path, chunk_cells):
+    n, N = 40, 1300
+    world = MemmapWorld(str(tmp_path), n, N, seed = 0, chunk_cells = chunk_cells)
+    assert list(group_counts(world)) == [n*n - N, N//2 + 1, N - (N//2 + 1)]
+    assert sorted(world.vacant) == list(np.flatnonzero(world.groups.ravel() < 0))
+
+
+@pytest.mark.parametrize('chunk_cells', [30, 97, 10**6])
+def test_update_happy_matches_whole_grid(tmp_path, chunk_cells):
+    world = MemmapWorld(str(tmp_path), 40, 1300, 0.5, seed = 1, chunk_cells = chunk_cells)
+    world.update_happy()
+    groups = np.array(world.groups)
+    similar, occupied = similar_counts(groups)
+    happy = happy_mask(similar, occupied, 0.5) & (groups >= 0)
+    assert (world.happy == happy).all()
+    assert world.n_happy == np.count_nonzero(happy)
+    assert world.n_unhappy == np.count_nonzero(groups >= 0) - world.n_happy
+
+
+@pytest.mark.parametrize('chunk_cells', [30, 97, 10**6])
+def test_moves_keep_counts(tmp_path, chunk_cells):
+    n, N = 40, 1300
+    world = MemmapWorld(str(tmp_path), n, N, 0.6, seed = 2, chunk_cells = chunk_cells)
+    before = group_counts(world)
+    trace = world.run(5)
+    assert (group_counts(world) == before).all()
+    assert sorted(world.vacant) == list(np.flatnonzero(world.groups.ravel() < 0))
+    assert trace[-1, 1] > trace[0, 1]
+
+
+def test_split_counts_above_limit():
+    rng = np.random.default_rng(0)
+    sizes = [HYPERGEOMETRIC_LIMIT, 3*HYPERGEOMETRIC_LIMIT, 5, HYPERGEOMETRIC_LIMIT//2]
+    for nsample in (0, 7, 10**6, sum(sizes) - 10**6, sum(sizes)):
+        counts = split_counts(rng, sizes, nsample)
+        assert sum(counts) == nsample
+        assert all(0 <= k <= size for k, size in zip(counts, sizes))